@@ -35,12 +35,55 @@
 # email: adh5584@truman.edu, yz4586@truman.edu
 # ---------------------------------------------------------------------------------------------------------------
 
-import re
+import sys
+from itertools import compress
 
 
 SEQUENCE_10 = "TATAAT"  # The most common -10 consensus sequence found in most prokaryotic promoters
 SEQUENCE_35 = "TTGACA"  # The most common -35 consensus sequence found in most prokaryotic promoters
 
+# The consensus sequences as ASCII bytes, the same as the DNA they are compared against
+SEQUENCE_10_BYTES = SEQUENCE_10.encode('ascii')
+SEQUENCE_35_BYTES = SEQUENCE_35.encode('ascii')
+
+# The nucleotides each ambiguity code can stand for
+IUPAC = {
+    'R': frozenset('AG'),
+    'Y': frozenset('CT'),
+    'S': frozenset('CG'),
+    'W': frozenset('AT'),
+    'K': frozenset('GT'),
+    'M': frozenset('AC'),
+    'B': frozenset('CGT'),
+    'V': frozenset('ACG'),
+    'D': frozenset('AGT'),
+    'H': frozenset('ACT'),
+    'N': frozenset('ACGT')
+}
+
+# Whether a DNA nucleotide matches a consensus nucleotide, keyed by the byte values of (consensus nucleotide, DNA nucleotide)
+MATCH = {(ord(consensus), ord(nucleotide)): nucleotide == consensus or nucleotide in IUPAC.get(consensus, ())
+         for consensus in 'ACGTRYSWKMBVDHN' for nucleotide in 'ACGT'}
+
+# The standard DNA nucleotides, which are deleted from the input so only invalid characters are left behind
+_DNA_OK = b'ACGTacgt'
+
+# Translation tables that unpack the -35 score from the low 4 bits and the -10 score from the high 4 bits of a byte
+_LOW_SCORE = bytes(value & 0xF for value in range(256))
+_HIGH_SCORE = bytes(value >> 4 for value in range(256))
+
+
+def load_dna(file_name):
+    '''
+    Reads the DNA from a text(txt) file as ASCII bytes, so it can be checked and scanned without being decoded,
+    and closes the file once it has been read.
+
+    :param str file_name: the path to the file containing the DNA sequence
+    :return bytes input_dna_sequence: the contents of the file
+    '''
+    with open(file_name, 'rb') as file:
+        return file.read()
+
 
 def check_is_dna(input_dna_sequence):
     '''
@@ -50,9 +93,9 @@ def check_is_dna(input_dna_sequence):
     the user is prompted to enter a new text string or file. This function also assumes
     that the DNA input does not use nucleotide ambiguity codes.
 
-    :param str input_dna_sequence: the string of DNA inputted by the user
+    :param bytes input_dna_sequence: the string of DNA inputted by the user, as ASCII bytes
     '''
-    if re.search('[^ACTGacgt]', input_dna_sequence):
+    if input_dna_sequence.translate(None, _DNA_OK):
         print("Please enter a valid DNA sequence!")
         return False
     return True
@@ -62,51 +105,117 @@ def fuzzy_match(string1, string2):
     '''
     This function that compares two strings, one of which may use ambiguity codes, and 
     returns the number of matching nucleotides. It assumes that both strings are the same length 
-    an that string2 would be the only string to use ambiguity codes
+    an that string2 would be the only string to use ambiguity codes. Both strings must already be uppercase,
+    since each pair of nucleotides is scored with a single lookup in the precomputed MATCH table, and a
+    KeyError is raised for any nucleotide that is not in the table.
+
+    :param str string1: the first string to compare, as a str or ASCII bytes
+    :param str string2: the second string to compare that can include nucleotide ambiguity codes, as a str or ASCII bytes
+    '''
+    # MATCH is keyed by byte values, so str input is encoded first
+    if isinstance(string1, str):
+        string1 = string1.encode('ascii')
+    if isinstance(string2, str):
+        string2 = string2.encode('ascii')
+    return sum(MATCH[(string2[index], string1[index])] for index in range(0, len(string1)))
+
+
+def score_tables(consensus_35, consensus_10):
+    '''
+    Builds the translation tables score_positions uses for a pair of consensus sequences. The table for each
+    offset maps a DNA nucleotide to 1 if it matches the -35 nucleotide at that offset plus 16 if it matches
+    the -10 nucleotide, with the ambiguity codes already worked out from the MATCH table.
+
+    :param bytes consensus_35: the -35 consensus sequence as ASCII bytes, which can include nucleotide ambiguity codes
+    :param bytes consensus_10: the -10 consensus sequence as ASCII bytes, the same length as consensus_35
+    :return tuple: one 256 byte translation table for each offset into the consensus sequences
+    '''
+    return tuple(bytes(MATCH.get((nucleotide_35, value), False) + 16 * MATCH.get((nucleotide_10, value), False)
+        for value in range(256)) for nucleotide_35, nucleotide_10 in zip(consensus_35, consensus_10))
 
-    :param str string1: the first string to compare 
-    :param str string2: the second string to compare that can include nucleotide ambiguity codes
+
+# The translation tables for the -35 and -10 consensus sequences, built once when the program starts
+_SCORE_TABLES = score_tables(SEQUENCE_35_BYTES, SEQUENCE_10_BYTES)
+
+
+def score_positions(dna_bytes):
     '''
-    matching_nucleotides = 0
-    string1 = string1.upper()
-    string2 = string2.upper()
-
-    for index in range(0, len(string1)):
-        if string1[index] == string2[index]:
-            matching_nucleotides += 1
-        elif string2[index] == 'R':
-            if string1[index] == 'A' or string1[index] == 'Y':
-                matching_nucleotides += 1
-        elif string2[index] == 'Y':
-            if string1[index] == 'C' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'S':
-            if string1[index] == 'C' or string1[index] == 'G':
-                matching_nucleotides += 1
-        elif string2[index] == 'W':
-            if string1[index] == 'A' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'K':
-            if string1[index] == 'G' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'M':
-            if string1[index] == 'A' or string1[index] == 'C':
-                matching_nucleotides += 1
-        elif string2[index] == 'B':
-            if string1[index] == 'C' or string1[index] == 'G' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'V':
-            if string1[index] == 'A' or string1[index] == 'C' or string1[index] == 'G':
-                matching_nucleotides += 1
-        elif string2[index] == 'D':
-            if string1[index] == 'A' or string1[index] == 'G' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'H':
-            if string1[index] == 'A' or string1[index] == 'C' or string1[index] == 'T':
-                matching_nucleotides += 1
-        elif string2[index] == 'N':
-            matching_nucleotides += 1
-    return matching_nucleotides
+    Scores every 6 nucleotide window of the DNA against both the -35 and -10 consensus sequences at once,
+    using the translation tables in _SCORE_TABLES. For each offset into the consensus sequences, the DNA
+    is translated into a mask that holds 1 where it matches the -35 nucleotide and 16 where it matches the
+    -10 nucleotide, so the two scores are packed into the low and high 4 bits of each byte. Each mask is read as one large little-endian int, so every byte becomes an
+    8 bit lane, and the masks are shifted by their offset and added together. Neither half of a lane can
+    go over 6, so nothing ever carries into the next half or lane. The packed lanes are then split back
+    into one byte of -35 score and one byte of -10 score per window.
+
+    :param bytes dna_bytes: the uppercase DNA sequence encoded as ASCII bytes
+    :return tuple: the -35 and -10 match score of each window, as bytes with one byte per starting position
+    '''
+    num_windows = len(dna_bytes) - len(SEQUENCE_35_BYTES) + 1
+    if num_windows <= 0:
+        return b"", b""
+    lanes = 0
+    for offset, table in enumerate(_SCORE_TABLES):
+        lanes += int.from_bytes(dna_bytes.translate(table), 'little') >> (8 * offset)
+    packed_scores = lanes.to_bytes(len(dna_bytes), 'little')[:num_windows]
+    return packed_scores.translate(_LOW_SCORE), packed_scores.translate(_HIGH_SCORE)
+
+
+def scan(scores_35, scores_10, dna_length, threshold):
+    '''
+    The scanning loop of find_possible_prokaryotic_sequences. It only works with the precalculated window
+    scores and returns the start, end and match score of each possible promoter in three parallel lists,
+    leaving the promoter sequences to be sliced out afterwards. Rather than looping over every -35 window
+    that could start a promoter, the -35 windows and the -10 windows that score high enough to go with
+    them are read as large ints of 0/1 byte lanes, like in score_positions. ORing the -10 lanes with
+    themselves shifted by 1, 2 and 4 windows covers windows i to i + 7, and ORing in the -10 lanes shifted
+    by 8 and 9 windows as well marks every window i that has a -10 match anywhere in windows i to i + 9.
+    ANDing that with the -35 lanes leaves only the -35 windows that really start a possible promoter.
+    Python then only has to find the first -10 match for each of those.
+
+    :param bytes scores_35: the match score of each window against the -35 consensus sequence
+    :param bytes scores_10: the match score of each window against the -10 consensus sequence
+    :param int dna_length: the length of the DNA sequence the scores were calculated from
+    :param int threshold: the minimum number of nucleotides that should match the consensus sequences
+    :return tuple: the lists of start positions, end positions and match scores of the possible promoters
+    '''
+    num_windows = len(scores_35)
+    # The -10 consensus can not start within the last 11 nucleotides of the DNA
+    scores_10 = scores_10[:max(0, dna_length - 11)]
+    # A -10 match can add at most 6 nucleotides, so a -35 window needs at least threshold - 6 matching nucleotides
+    # as well as the usual 4. Group the -35 scores by the lowest -10 score that brings them up to the threshold
+    minimum_10_for = {}
+    for num_matching_nucleotides in range(max(4, threshold - 6), 7):
+        minimum_10_for[num_matching_nucleotides] = max(4, threshold - num_matching_nucleotides)
+
+    masks_10 = {}
+    promoter_windows = 0
+    for minimum_10 in set(minimum_10_for.values()):
+        masks_10[minimum_10] = scores_10.translate(bytes(value >= minimum_10 for value in range(256)))
+        windows_35 = int.from_bytes(scores_35.translate(bytes(minimum_10_for.get(value) == minimum_10
+            for value in range(256))), 'little')
+        windows_10 = int.from_bytes(masks_10[minimum_10], 'little')
+        # Byte i of any_10 is 1 if any of the -10 windows i to i + 9 match. Shifting by 1, 2 and 4 windows
+        # (8, 16 and 32 bits) covers windows i to i + 7, and windows i + 8 and i + 9 are ORed in directly
+        any_10 = windows_10 | (windows_10 >> 8)
+        any_10 |= any_10 >> 16
+        any_10 = (any_10 | (any_10 >> 32)) | (windows_10 >> 64) | (windows_10 >> 72)
+        # The -10 window starts anywhere from index + 21 (the length of the -35 consensus plus the minimum of
+        # 16 base pairs between the consensus sequences) up to index + 30
+        promoter_windows |= windows_35 & (any_10 >> (8 * 21))
+    promoter_windows = promoter_windows.to_bytes(num_windows, 'little')
+
+    positions = []
+    ends = []
+    scores = []
+    for index in compress(range(num_windows), promoter_windows):
+        num_matching_nucleotides = scores_35[index]
+        # Only the first -10 match is kept for each position
+        next_index = masks_10[minimum_10_for[num_matching_nucleotides]].find(1, index + 21, index + 31)
+        positions.append(index)
+        ends.append(next_index + 6)
+        scores.append(num_matching_nucleotides + scores_10[next_index])
+    return positions, ends, scores
 
 
 # Function that steps through the input string, analyzing each substring of the appropriate length to be a possible prokaryotic promoter that includes both -35 and -10 elements and calculating an overall match score for that substring
@@ -118,31 +227,23 @@ def find_possible_prokaryotic_sequences(input_dna_sequence, threshold):
     next 6 nucleotides, within 16-19 nucleotides downstream and compares it to the -10 consensus sequence. If the difference 
     in nucleotides is with 1-2 nucleotide difference from the consensus and the count of matching nucleotides is greater than
     or equal to the user defined threshold, that sequence gets added to the dict of possible promoters. The possible promoters
-    are stored in a dict with the list of the position where the -35 consensus sequence starts, the actual promoter sequence,
-    and the match score. 
+    are stored in a dict with the list of the positions where the -35 consensus sequence starts, in the order they were found,
+    and a dict that maps each of those positions to where the promoter ends, the actual promoter sequence and the match score. 
 
-    :param str input_dna_sequence: the string of DNA inputted from the user
+    :param bytes input_dna_sequence: the uppercase string of DNA inputted from the user, as ASCII bytes
     :param str threshold: the minimum number of nucleotides that should match the consensus sequences in a range of 8-12
     :return dict possible_promoters: a dict of all the possible promoters in the DNA sequence
     '''
     possible_promoters = {
-        "positions": [],
-        "sequences": [],
-        "scores": []
+        "order": [],
+        "by_pos": {}
     }
-    for index in range(0, len(input_dna_sequence) - 5):
-        num_matching_nucleotides = fuzzy_match(SEQUENCE_35, input_dna_sequence[index: index+6])
-        if num_matching_nucleotides >= 4:
-            next_index = index + 21 #length of the -35 consensus plus the minimum of 16 base pairs between the consensus sequences
-            while next_index < len(input_dna_sequence) - 11 and next_index < index + 31:
-                # the length of a promoter is anywhere from 16 - 19 bp. It stops checking if it goes over 19 + consensus sequence
-                next_matching_nucleotides = fuzzy_match(SEQUENCE_10, input_dna_sequence[next_index: next_index + 6])
-                if next_matching_nucleotides >= 4 and num_matching_nucleotides + next_matching_nucleotides >= threshold:
-                    if index not in possible_promoters["positions"]:
-                        possible_promoters["positions"].append(index)
-                        possible_promoters["sequences"].append(input_dna_sequence[index:next_index + 6])
-                        possible_promoters["scores"].append(num_matching_nucleotides + next_matching_nucleotides)
-                next_index += 1
+    # Score every -35 and -10 window up front so the scan only has to look up each score
+    scores_35, scores_10 = score_positions(input_dna_sequence)
+    positions, ends, scores = scan(scores_35, scores_10, len(input_dna_sequence), threshold)
+    for index, end, score in zip(positions, ends, scores):
+        possible_promoters["order"].append(index)
+        possible_promoters["by_pos"][index] = (end, input_dna_sequence[index:end].decode('ascii'), score)
     return possible_promoters
 
 
@@ -161,11 +262,13 @@ def print_promoter_sequences(possible_promoters):
 
     :param dict possible_promoters: a dict of all the possible promoters in the DNA sequence
     '''
-    print("\nPossible Promoters in the DNA sequence:\n")
-    print('{:13s} {:50s}  {:8s}'.format('Position', "Sequence", "Score"))
-    for index in range(0, len(possible_promoters["positions"])):
-        print('{:2s} {:10s} {:50s}  {:3s} {:2s}'.format("[ ", str(possible_promoters["positions"][index]), 
-            possible_promoters["sequences"][index], str(possible_promoters["scores"][index]), " ]"))
+    # Build the whole list first so it is written out all at once
+    lines = ["\nPossible Promoters in the DNA sequence:\n"]
+    lines.append('{:13s} {:50s}  {:8s}'.format('Position', "Sequence", "Score"))
+    for position in possible_promoters["order"]:
+        end, sequence, score = possible_promoters["by_pos"][position]
+        lines.append('{:2s} {:10s} {:50s}  {:3s} {:2s}'.format("[ ", str(position), sequence, str(score), " ]"))
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def print_each_sequence(input_dna_sequence, possible_promoters, position):
@@ -175,23 +278,17 @@ def print_each_sequence(input_dna_sequence, possible_promoters, position):
     promoter locations and this function will display the original DNA input with the selected possible promoter
     in it's original location, highlighted in pink.
 
-    :param str input_dna_sequence: the string of DNA inputted from the user
+    :param bytes input_dna_sequence: the string of DNA inputted from the user, as ASCII bytes
     :param dict possible_promoters: a dict of all the possible promoters in the DNA sequence
     :param int position: the position of a possible promoter that the user chose to have dispayed
     '''
-    if position in possible_promoters["positions"]:
-        print("\nDNA Sequence: \n")
-
-        # Print the DNA before the promoter
-        print(input_dna_sequence[0: position], end="")
-
-        # Print the possible promoter in pink
-        position_index = possible_promoters["positions"].index(position)
-        print('\033[95m' + input_dna_sequence[position: position + 
-            len(possible_promoters["sequences"][position_index])] + '\033[0;0m', end="")
-
-        # Print the rest of the DNA
-        print(input_dna_sequence[(position + len(possible_promoters["sequences"][position_index])):])
+    if position in possible_promoters["by_pos"]:
+        end, sequence, score = possible_promoters["by_pos"][position]
+        # Write the DNA before the promoter, the possible promoter in pink and then the rest of the DNA all at once
+        sys.stdout.write("\nDNA Sequence: \n\n" +
+            input_dna_sequence[0: position].decode('ascii') +
+            '\033[95m' + input_dna_sequence[position: end].decode('ascii') + '\033[0;0m' +
+            input_dna_sequence[end:].decode('ascii') + "\n")
 
 
 def print_instructions():
@@ -242,25 +339,25 @@ def main():
 
     file_or_input = input("Do you want to enter a file or text[F/T]: ")
     if file_or_input.upper() == 'T':
-        input_dna_sequence = input("Please enter a non template DNA string: ")
+        input_dna_sequence = input("Please enter a non template DNA string: ").encode('ascii', 'replace')
     elif file_or_input.upper() == 'F':
         file_name = input("Please enter a file path: ")
-        file = open(file_name, 'r')
-        input_dna_sequence = file.read()
+        input_dna_sequence = load_dna(file_name)
 
     # Check that the input is valid DNA and if not prompt the user to input again until it is valid
     is_valid = check_is_dna(input_dna_sequence)
     while not is_valid:
         if file_or_input.upper() == 'T':
-            input_dna_sequence = input("Please enter a non template DNA string: ")
+            input_dna_sequence = input("Please enter a non template DNA string: ").encode('ascii', 'replace')
         elif file_or_input.upper() == 'F':
             file_name = input("Please enter the file path to input with correct DNA data: ")
-            file = open(file_name, 'r')
-            input_dna_sequence = file.read()
+            input_dna_sequence = load_dna(file_name)
         is_valid = check_is_dna(input_dna_sequence)
 
 
     if is_valid:
+        # Uppercase the DNA once here, since the scanning functions expect uppercase nucleotides
+        input_dna_sequence = input_dna_sequence.upper()
         threshold = input("Please enter a threshold in the range of 8-12 matching nucleotides: ")
         threshold = int(threshold)
         possible_promoters = find_possible_prokaryotic_sequences(input_dna_sequence, threshold)